@@ -12,15 +12,17 @@ from typing import Dict, Any
 
 import chainlit as cl
 
-from app.rag import answer_with_docs_async
+from app.rag import answer_with_docs_stream, clear_caches, prewarm_async
 from app.ingest import run_ingest_async
+from app.utils import close_http_client
 
 # ============================================================================
 # Global State Management
 # ============================================================================
 # Thread-safe ingestion tracking to prevent concurrent ingestion jobs
-_ingest_lock = asyncio.Lock()
+_ingest_lock = asyncio.Lock()        # Guards only the creation of _ingest_task
 _ingest_task: asyncio.Task | None = None
+_ingest_done = asyncio.Event()       # Set whenever an ingestion job finishes
 _ingest_last: Dict[str, Any] = {
     "status": "idle",      # Current status: idle | running | succeeded | failed
     "started_at": None,    # Timestamp when ingestion started
@@ -29,6 +31,9 @@ _ingest_last: Dict[str, Any] = {
     "error": None,         # Error message if failed
 }
 
+# Background cache warm-up for suggested questions (runs once per process)
+_warmup_task: asyncio.Task | None = None
+
 
 async def _ingest_job():
     """
@@ -50,6 +55,9 @@ async def _ingest_job():
         # Run ingestion process
         stats = await run_ingest_async()
         
+        # Drop answers cached against the previous index contents
+        await clear_caches()
+        
         # Update with success status
         _ingest_last.update({
             "status": "succeeded",
@@ -63,6 +71,20 @@ async def _ingest_job():
             "finished_at": time.time(),
             "error": str(e)
         })
+    finally:
+        _ingest_done.set()
+
+
+async def _warmup(questions: list[str]):
+    """
+    Prewarm retrieval caches for suggested questions in background.
+    
+    Failures are logged only; questions are then answered without cached results.
+    """
+    try:
+        await prewarm_async(questions)
+    except Exception as e:
+        print(f"⚠ Cache warm-up failed: {e}")
 
 
 # @cl.on_chat_start
@@ -122,6 +144,11 @@ async def start():
         )
     ).send()
 
+    # Warm caches for suggested questions without blocking the session
+    global _warmup_task
+    if _warmup_task is None:
+        _warmup_task = asyncio.create_task(_warmup(suggested_questions))
+
 
 
 @cl.on_message
@@ -151,13 +178,17 @@ async def main(message: cl.Message):
     start_time = time.perf_counter()
     
     try:
-        # Query RAG system for answer
-        answer, sources, contexts = await answer_with_docs_async(content)
+        # Stream answer tokens from RAG system as they are generated
+        sources, contexts = [], []
+        async for chunk in answer_with_docs_stream(content):
+            if isinstance(chunk, str):
+                await msg.stream_token(chunk)
+            else:
+                sources, contexts = chunk
         
         elapsed = time.perf_counter() - start_time
         
-        # Display main answer
-        msg.content = answer
+        # Finalize main answer
         await msg.update()
         
         # Append source documents if enabled
@@ -214,16 +245,25 @@ async def handle_command(command: str):
     
     # Document ingestion command
     if cmd == "/ingest":
-        # Prevent concurrent ingestion jobs
-        async with _ingest_lock:
-            if _ingest_task and not _ingest_task.done():
-                await cl.Message(
-                    content="⚠️ Ingestion is already running. Please wait for it to complete."
-                ).send()
-                return
-            
-            await cl.Message(content="🔄 Starting document ingestion...").send()
-            _ingest_task = asyncio.create_task(_ingest_job())
+        # Report a running job without touching the lock
+        already_running = bool(_ingest_task and not _ingest_task.done())
+        
+        # Re-check under the lock so simultaneous /ingest commands start one job
+        if not already_running:
+            async with _ingest_lock:
+                if _ingest_task and not _ingest_task.done():
+                    already_running = True
+                else:
+                    _ingest_done.clear()
+                    _ingest_task = asyncio.create_task(_ingest_job())
+        
+        if already_running:
+            await cl.Message(
+                content="⚠️ Ingestion is already running. Please wait for it to complete."
+            ).send()
+            return
+        
+        await cl.Message(content="🔄 Starting document ingestion...").send()
         
         # Monitor ingestion progress and report results
         try:
@@ -257,6 +297,10 @@ async def handle_command(command: str):
     
     # Status inquiry command
     elif cmd == "/status":
+        # Optionally block until a running ingestion finishes (`/status wait`)
+        if _ingest_last["status"] == "running" and "wait" in command.lower().split()[1:]:
+            await _ingest_done.wait()
+        
         # Build status message based on current state
         status = _ingest_last["status"]
         
@@ -286,6 +330,7 @@ async def handle_command(command: str):
 **Document Management:**
 - `/ingest` - Ingest documents from the data/ folder
 - `/status` - Check ingestion status
+- `/status wait` - Wait for a running ingestion to finish, then show its status
 
 **Help:**
 - `/help` - Show this help message
@@ -303,6 +348,12 @@ async def handle_command(command: str):
         ).send()
 
 
+@cl.on_app_shutdown
+async def shutdown():
+    """Release shared network clients when the app stops."""
+    await close_http_client()
+
+
 @cl.on_settings_update
 async def setup_settings(settings):
     """
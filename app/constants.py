@@ -6,20 +6,34 @@ Constants used across the application
 INDEX_NAME = "hnsw_index"
 EMBEDDING_TABLE_NAME = "langchain_pg_embedding"
 
-# Chunking configuration
-CHUNK_SIZE = 500
-CHUNK_OVERLAP = 100
+# Chunking configuration (sizes in tokens)
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+CHUNK_ENCODING = "cl100k_base"
+
+# Embedding batches during ingestion
+EMBED_BATCH_SIZE = 512
+EMBED_CONCURRENCY = 8
 
 # HNSW index parameters
 HNSW_EF_CONSTRUCTION = 64
 HNSW_M = 16
+HNSW_EF_SEARCH = 100  # Candidate list size at query time (pgvector default: 40)
 
 # Retrieval configuration
 RAG_K = 10
 USE_MULTI_QUERY = True
+MULTI_QUERY_SKIP_SIMILARITY = 0.85  # Use single-query retrieval above this similarity to a recent question
+RECENT_QUERIES_SIZE = 32
 RERANK_TOP_N = 8
 COHERE_RERANK_MODEL = "rerank-multilingual-v3.0"
 
+# Query-result cache (reuses retrieved documents for near-duplicate questions)
+QVCACHE_MAX_ENTRIES = 1024
+QVCACHE_SIMILARITY_THRESHOLD = 0.9
+EMBEDDING_MEMO_SIZE = 1024  # Recent question embeddings kept to avoid re-embedding
+PREWARM_CONCURRENCY = 2  # Parallel retrievals when warming the cache for suggested questions
+
 # Default values
 DEFAULT_DATA_DIR = "data"
 DEFAULT_OPENAI_MODEL = "gpt-4o"
@@ -110,3 +124,6 @@ EMBEDDING_MODEL = "text-embedding-3-small"
 
 # Redis cache
 REDIS_CACHE_DISTANCE_THRESHOLD = 0.8
+REDIS_PING_TIMEOUT = 0.2  # seconds
+REDIS_RETRY_BACKOFF_INITIAL = 1.0  # seconds
+REDIS_RETRY_BACKOFF_MAX = 60.0  # seconds
@@ -6,8 +6,9 @@ faithfulness, answer relevancy, context precision, and context recall.
 """
 
 import asyncio
-import json
 import os
+from pathlib import Path
+import orjson
 import pandas as pd
 from dotenv import load_dotenv
 from ragas import evaluate
@@ -16,38 +17,32 @@ from langchain_openai import ChatOpenAI
 from ragas.metrics import faithfulness, answer_relevancy, context_precision, context_recall
 from ragas.run_config import RunConfig
 from .rag import answer_with_docs_async
+from .utils import http_async_client, close_http_client
 from .constants import DEFAULT_OPENAI_MODEL
 
+# Number of test questions answered in parallel
+EVAL_CONCURRENCY = 8
+
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 # Initialize OpenAI LLM for RAGAS evaluation
-oai_llm = ChatOpenAI(model=DEFAULT_OPENAI_MODEL)
+oai_llm = ChatOpenAI(model=DEFAULT_OPENAI_MODEL, http_async_client=http_async_client)
 
 def load_jsonl(path):
     """Load test dataset from JSON file."""
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(Path(path).read_bytes())
 
 def print_eval_res(eval_result):
     """Display evaluation results in tabular format with averages."""
-    scores = eval_result.scores
-    
-    # Print header
-    eval_str = ' | Q | '
-    for k in scores[0].keys():
-        eval_str = eval_str + str(k) + ' | '
-    print(eval_str)
+    res = eval_result.to_pandas()
     
     # Print scores per question
-    for i, score in enumerate(scores):
-        eval_str = ' | ' + str(i + 1) + ' | '
-        for k in score.keys():
-            eval_str = eval_str + str(score[k]) + ' | '
-        print(eval_str)
+    scores = res.select_dtypes("number")
+    scores.index = scores.index + 1
+    print(scores.round(3).to_markdown(index=True))
     
     # Print averages
-    res = eval_result.to_pandas()
     means = res.mean(numeric_only=True).to_dict()
     print("\n📈 Averages:")
     for k, v in means.items():
@@ -68,23 +63,25 @@ async def evaluate_rag_system(test_path=None):
         test_path = os.path.join(os.path.dirname(__file__), '..', 'seed', 'qna_test.json')
     
     test_data = load_jsonl(test_path)
-    results = []
 
-    # Query RAG system for each test question
-    for item in test_data:
-        question = item["question"]
-        reference_answer = item["answer"]
-        
-        answer, sources, contexts = await answer_with_docs_async(question)
+    # Query RAG system for test questions concurrently
+    sem = asyncio.Semaphore(EVAL_CONCURRENCY)
 
-        results.append(
-            SingleTurnSample(
-                user_input=question,
-                response=answer,
-                reference=reference_answer,
-                retrieved_contexts=contexts,
-            )
+    async def _answer(item):
+        async with sem:
+            return await answer_with_docs_async(item["question"])
+
+    outputs = await asyncio.gather(*[_answer(item) for item in test_data])
+
+    results = [
+        SingleTurnSample(
+            user_input=item["question"],
+            response=answer,
+            reference=item["answer"],
+            retrieved_contexts=contexts,
         )
+        for item, (answer, sources, contexts) in zip(test_data, outputs)
+    ]
     
     # Run RAGAS evaluation
     ds = EvaluationDataset(results)
@@ -96,6 +93,13 @@ async def evaluate_rag_system(test_path=None):
     print("RAGAS Evaluation Results:")
     print_eval_res(eval_result)
 
+async def main():
+    """Run evaluation and release the shared HTTP client."""
+    try:
+        await evaluate_rag_system()
+    finally:
+        await close_http_client()
+
 if __name__ == "__main__":
     # Run evaluation: python -m app.eval_ragas
-    asyncio.run(evaluate_rag_system())
+    asyncio.run(main())
@@ -7,19 +7,26 @@ Supports PDF, DOCX, Markdown, and TXT files.
 """
 
 from __future__ import annotations
-import os, glob, uuid, asyncio, traceback
-from typing import Iterable, List, Dict, Any
+import os, uuid, asyncio, traceback, multiprocessing
+from typing import Iterable, List, Dict, Any, Optional
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import tiktoken
 
 from langchain.docstore.document import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import UnstructuredMarkdownLoader, PyMuPDFLoader, UnstructuredWordDocumentLoader,TextLoader
 
-from .utils import get_vector_store
+from .utils import get_vector_store, embeddings
 from .constants import (
     DEFAULT_DATA_DIR, 
     CHUNK_SIZE, 
     CHUNK_OVERLAP, 
+    CHUNK_ENCODING,
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
     INDEX_NAME,
     HNSW_EF_CONSTRUCTION,
     HNSW_M
@@ -28,59 +35,108 @@ from langchain_postgres.v2.indexes import HNSWIndex, DistanceStrategy
 
 DATA_DIR = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
 
-def _load_docs(base: str = DATA_DIR) -> tuple[List[Document], List[str]]:
-    """Load documents from directory and return documents with file paths."""
+# Document loader for each supported file extension
+LOADERS = {
+    ".md": UnstructuredMarkdownLoader,
+    ".pdf": PyMuPDFLoader,
+    ".docx": UnstructuredWordDocumentLoader,
+    ".txt": TextLoader,
+}
+
+def _iter_files(base: str) -> Iterable[str]:
+    """Recursively yield file paths under base, skipping hidden entries."""
+    if not os.path.isdir(base):
+        return
+    with os.scandir(base) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            else:
+                yield entry.path
+
+def _load_one(path: str) -> tuple[str, Optional[List[Document]]]:
+    """Load a single file based on its extension. Runs in a worker process."""
+    loader_cls = LOADERS.get(os.path.splitext(path)[1].lower())
+    if loader_cls is None:
+        return path, None
+    try:
+        return path, loader_cls(path).load()
+    except Exception:
+        print(f"INGEST ERROR: failed to load {path}")
+        traceback.print_exc()
+    return path, None
+
+async def _load_docs_async(base: str = DATA_DIR) -> tuple[List[Document], List[str]]:
+    """Load documents from directory in parallel and return documents with file paths."""
     docs: List[Document] = []
     file_paths: List[str] = []
 
-    # Recursively process all files in base directory
-    for path in glob.glob(os.path.join(base, "**", "*"), recursive=True):
-        if os.path.isdir(path) or os.path.basename(path).startswith("."):
-            continue
-        
-        ext = os.path.splitext(path)[1].lower()
-        try:
-            # Load based on file extension
-            if ext == ".md":
-                for d in UnstructuredMarkdownLoader(path).load():
-                    docs.append(d)
-                file_paths.append(path)
-            elif ext == ".pdf":
-                for d in PyMuPDFLoader(path).load():
-                    docs.append(d)
-                file_paths.append(path)
-            elif ext == ".docx":
-                for d in UnstructuredWordDocumentLoader(path).load():
-                    docs.append(d)
-                file_paths.append(path)
-            elif ext == ".txt":
-                for d in TextLoader(path).load():
-                    docs.append(d)
-                file_paths.append(path)
-
-        except Exception:
-            print(f"INGEST ERROR: failed to load {path}")
-            traceback.print_exc()
+    # Recursively collect supported files in base directory
+    file_list = [
+        path for path in _iter_files(base)
+        if os.path.splitext(path)[1].lower() in LOADERS
+    ]
+
+    # Parsing is CPU-bound, so spread files across worker processes
+    loop = asyncio.get_running_loop()
+    # Spawn workers: forking the threaded Chainlit server process can deadlock
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=mp_context) as pool:
+        futures = [loop.run_in_executor(pool, _load_one, path) for path in file_list]
+        for fut in asyncio.as_completed(futures):
+            path, loaded = await fut
+            if loaded is None:
+                continue
+            docs.extend(loaded)
+            file_paths.append(path)
 
     return docs, file_paths
         
 
-def _chunk(docs: List[Document]) -> List[Document]:
-    """Split documents into smaller chunks for embedding."""
-    print(f"INGEST: chunking {len(docs)} documents")
-    
-    splitter = RecursiveCharacterTextSplitter(
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    """Load tiktoken encoding once; the first load may download the BPE file."""
+    return tiktoken.get_encoding(CHUNK_ENCODING)
+
+def _token_len(text: str) -> int:
+    """Count tokens in text using the cached encoding."""
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=1)
+def _get_splitter() -> RecursiveCharacterTextSplitter:
+    """Build token-based text splitter once per process."""
+    return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
+        length_function=_token_len,
     )
+
+def _chunk(docs: List[Document]) -> List[Document]:
+    """Split documents into smaller chunks for embedding."""
+    print(f"INGEST: chunking {len(docs)} documents")
     
     try:
-        return splitter.split_documents(docs)
+        return _get_splitter().split_documents(docs)
     except Exception:
         print(f"INGEST ERROR: chunking failed")
         traceback.print_exc()
         raise
 
+async def _embed(texts: List[str]) -> List[List[float]]:
+    """Embed texts in large batches with bounded concurrency."""
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def _embed_batch(batch: List[str]) -> List[List[float]]:
+        async with sem:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    print(f"INGEST: embedding {len(texts)} chunks in {len(batches)} batches")
+    results = await asyncio.gather(*[_embed_batch(b) for b in batches])
+    return [vec for batch in results for vec in batch]
+
 async def _create_index(store):
     """Create HNSW index for efficient similarity search if not exists."""
     if await store.ais_valid_index(INDEX_NAME):
@@ -104,14 +160,21 @@ async def run_ingest_async() -> dict:
         dict: Statistics with document count, chunk count, and file paths
     """
     # Load documents from data directory
-    docs, file_paths = _load_docs()
+    docs, file_paths = await _load_docs_async()
 
-    # Split into chunks
-    chunks = _chunk(docs)
+    # Split into chunks off the event loop; token counting is CPU-bound
+    chunks = await asyncio.to_thread(_chunk, docs)
 
-    # Store in vector database
+    # Embed in batches, then store in vector database
+    texts = [c.page_content for c in chunks]
+    vectors = await _embed(texts)
     store = await get_vector_store()
-    await store.aadd_documents(chunks)
+    await store.aadd_embeddings(
+        texts,
+        vectors,
+        metadatas=[c.metadata for c in chunks],
+        ids=[str(uuid.uuid4()) for _ in chunks],
+    )
     print(f"INGEST: {len(docs)} docs, {len(chunks)} chunks")
 
     # Create search index
@@ -0,0 +1,173 @@
+"""In-process embedding memo, query-result cache and recent-question buffer."""
+
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+import threading
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+
+from .constants import (
+    EMBEDDING_MEMO_SIZE,
+    QVCACHE_MAX_ENTRIES,
+    QVCACHE_SIMILARITY_THRESHOLD,
+    RECENT_QUERIES_SIZE,
+)
+
+
+def _normalize(embedding: Sequence[float]) -> np.ndarray:
+    """Return the embedding as an L2-normalized float32 vector."""
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class LRUEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that remembers vectors for recently embedded texts.
+
+    Lets the semantic cache lookup, retrieval, and semantic cache update share
+    one embedding call per question.
+    """
+
+    def __init__(self, embeddings: Embeddings, capacity: int = EMBEDDING_MEMO_SIZE):
+        self.embeddings = embeddings
+        self.capacity = capacity
+        self._memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._memo.get(text)
+            if vec is not None:
+                self._memo.move_to_end(text)
+            return vec
+
+    def _put(self, text: str, vec: List[float]):
+        with self._lock:
+            self._memo[text] = vec
+            self._memo.move_to_end(text)
+            if len(self._memo) > self.capacity:
+                self._memo.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = self._get(text)
+        if vec is None:
+            vec = self.embeddings.embed_query(text)
+            self._put(text, vec)
+        return vec
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vec = self._get(text)
+        if vec is None:
+            vec = await self.embeddings.aembed_query(text)
+            self._put(text, vec)
+        return vec
+
+    def _fill(self, texts: List[str], vecs: List[Optional[List[float]]], fresh: List[List[float]]):
+        fresh_iter = iter(fresh)
+        for i, v in enumerate(vecs):
+            if v is None:
+                vecs[i] = next(fresh_iter)
+                self._put(texts[i], vecs[i])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vecs = [self._get(t) for t in texts]
+        missing = [t for t, v in zip(texts, vecs) if v is None]
+        if missing:
+            self._fill(texts, vecs, self.embeddings.embed_documents(missing))
+        return vecs
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vecs = [self._get(t) for t in texts]
+        missing = [t for t, v in zip(texts, vecs) if v is None]
+        if missing:
+            self._fill(texts, vecs, await self.embeddings.aembed_documents(missing))
+        return vecs
+
+
+class QVCache:
+    """
+    LRU cache of retrieved documents for recently seen query embeddings.
+
+    Embeddings are kept as rows of a single (capacity, d) matrix so a lookup
+    is one matrix-vector product. Unused rows are zero and never match.
+    """
+
+    def __init__(
+        self,
+        capacity: int = QVCACHE_MAX_ENTRIES,
+        threshold: float = QVCACHE_SIMILARITY_THRESHOLD,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._matrix: Optional[np.ndarray] = None
+        self._slots: "OrderedDict[int, List[Document]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[List[Document]]:
+        """Return cached documents for a query with cosine similarity >= threshold."""
+        with self._lock:
+            if not self._slots:
+                return None
+            sims = self._matrix @ _normalize(embedding)
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold or slot not in self._slots:
+                return None
+            self._slots.move_to_end(slot)
+            return self._slots[slot]
+
+    def insert(self, embedding: Sequence[float], docs: List[Document]):
+        """Cache documents for a query embedding, evicting the least recently used entry."""
+        vec = _normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+            if len(self._slots) < self.capacity:
+                slot = len(self._slots)
+            else:
+                slot, _ = self._slots.popitem(last=False)
+            self._matrix[slot] = vec
+            self._slots[slot] = docs
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._matrix = None
+            self._slots.clear()
+
+
+class RecentQueries:
+    """Ring buffer of the most recent question embeddings."""
+
+    def __init__(self, size: int = RECENT_QUERIES_SIZE):
+        self.size = size
+        self._matrix: Optional[np.ndarray] = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def max_similarity(self, embedding: Sequence[float]) -> float:
+        """Return the highest cosine similarity to a recent question (0.0 if none)."""
+        with self._lock:
+            if self._matrix is None:
+                return 0.0
+            return float(np.max(self._matrix @ _normalize(embedding)))
+
+    def add(self, embedding: Sequence[float]):
+        """Record a question embedding, overwriting the oldest one when full."""
+        vec = _normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.size, vec.shape[0]), dtype=np.float32)
+            self._matrix[self._next] = vec
+            self._next = (self._next + 1) % self.size
+
+    def clear(self):
+        """Forget all recorded questions."""
+        with self._lock:
+            self._matrix = None
+            self._next = 0
@@ -1,25 +1,36 @@
 """RAG system with multi-query retrieval, Cohere reranking, and Redis caching."""
 
-from typing import List, Tuple
+from typing import AsyncIterator, List, Optional, Tuple, Union
+import asyncio
+import json
 import os
 import re
+import time
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_core.runnables import Runnable
+from langchain_core.retrievers import BaseRetriever
+from langchain_openai import ChatOpenAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 from langchain.docstore.document import Document
 from langchain.retrievers.multi_query import MultiQueryRetriever
 
-from .utils import get_vector_store
+from .utils import get_vector_store, embeddings, http_async_client
+from .qvcache import LRUEmbeddings, QVCache, RecentQueries
 from .constants import (
     SYSTEM_PROMPT,
     USER_PROMPT_TEMPLATE,
     MULTI_QUERY_PROMPT_TEMPLATE,
     EMBEDDING_MODEL,
+    EMBEDDING_TABLE_NAME,
     REDIS_CACHE_DISTANCE_THRESHOLD,
+    REDIS_PING_TIMEOUT,
+    REDIS_RETRY_BACKOFF_INITIAL,
+    REDIS_RETRY_BACKOFF_MAX,
     RAG_K,
     USE_MULTI_QUERY,
+    MULTI_QUERY_SKIP_SIMILARITY,
+    PREWARM_CONCURRENCY,
     RERANK_TOP_N,
     COHERE_RERANK_MODEL,
     DEFAULT_OPENAI_MODEL
@@ -35,29 +46,133 @@ PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 REDIS_URL = os.getenv("REDIS_URL")
-embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL)
+
+# Semantic cache entries are namespaced per model pair and vector table,
+# so re-ingesting the table only has to drop this one cache index.
+SEMANTIC_CACHE_NAMESPACE = f"{OPENAI_MODEL}:{EMBEDDING_MODEL}:{EMBEDDING_TABLE_NAME}"
+semantic_cache = None
+
+# Question embeddings are memoized so each question is embedded once per request
+query_embeddings = LRUEmbeddings(embeddings)
+
+# Retrieved documents for recent questions, reused for near-duplicate queries
+query_cache = QVCache()
+
+# Embeddings of the last few questions, used to skip multi-query on paraphrases
+recent_queries = RecentQueries()
+
+# Retriever and document chain are built once and reused until the next ingest
+_CHAIN: Optional[Tuple[BaseRetriever, Optional[BaseRetriever], Runnable]] = None
+_chain_lock = asyncio.Lock()
+
+# Redis connections are opened lazily; the first request pings the server
+_redis = None
+_redis_ready = False
+_redis_retry_at = 0.0
+_redis_backoff = REDIS_RETRY_BACKOFF_INITIAL
 
-# Initialize Redis cache for LLM responses
 if REDIS_URL:
     try:
-        from langchain.globals import set_llm_cache
-        from langchain_community.cache import RedisCache
-        import redis
-        
-        # Test Redis connection
-        r = redis.from_url(REDIS_URL)
-        r.ping()
+        from langchain_community.cache import RedisSemanticCache
+        from redis import asyncio as aioredis
         
-        # Set up standard Redis cache (exact match caching)
-        set_llm_cache(RedisCache(redis_=r))
-        print("✓ Redis cache enabled")
+        _redis = aioredis.from_url(REDIS_URL, decode_responses=False, max_connections=32)
+
+        # Set up semantic cache for full answers (paraphrased questions)
+        semantic_cache = RedisSemanticCache(
+            redis_url=REDIS_URL,
+            embedding=query_embeddings,
+            score_threshold=1 - REDIS_CACHE_DISTANCE_THRESHOLD,
+        )
     except Exception as e:
         print(f"⚠ Redis cache disabled: {e}")
 
+async def _ensure_redis_cache() -> bool:
+    """Ping Redis and enable LLM caching on first success, backing off exponentially on failure."""
+    global _redis_ready, _redis_retry_at, _redis_backoff
+    if _redis is None:
+        return False
+    if _redis_ready:
+        return True
+
+    now = time.monotonic()
+    if now < _redis_retry_at:
+        return False
+    try:
+        await asyncio.wait_for(_redis.ping(), timeout=REDIS_PING_TIMEOUT)
+    except Exception as e:
+        print(f"⚠ Redis cache unavailable, retrying in {_redis_backoff:.1f}s: {e!r}")
+        _redis_retry_at = now + _redis_backoff
+        _redis_backoff = min(_redis_backoff * 2, REDIS_RETRY_BACKOFF_MAX)
+        return False
+
+    from langchain.globals import set_llm_cache
+    from langchain_community.cache import AsyncRedisCache
+
+    # Set up standard Redis cache (exact match caching)
+    set_llm_cache(AsyncRedisCache(redis_=_redis))
+    _redis_ready = True
+    print("✓ Redis cache enabled")
+    return True
+
+async def _semantic_cache_lookup(question: str) -> Optional[Tuple[str, List[str], List[str]]]:
+    """Return a cached (answer, sources, context) for a similar question, if any."""
+    if semantic_cache is None or not await _ensure_redis_cache():
+        return None
+    try:
+        hit = await asyncio.to_thread(semantic_cache.lookup, question, SEMANTIC_CACHE_NAMESPACE)
+    except Exception as e:
+        print(f"⚠ Semantic cache lookup failed: {e}")
+        return None
+    if not hit:
+        return None
+    payload = json.loads(hit[0].text)
+    return payload["answer"], payload["sources"], payload["context"]
+
+async def _semantic_cache_update(question: str, answer: str, sources: List[str], context: List[str]):
+    """Store a JSON-encoded (answer, sources, context) payload for the question."""
+    if semantic_cache is None or not _redis_ready:
+        return
+    from langchain_core.outputs import Generation
+    payload = json.dumps({"answer": answer, "sources": sources, "context": context})
+    try:
+        await asyncio.to_thread(
+            semantic_cache.update, question, SEMANTIC_CACHE_NAMESPACE, [Generation(text=payload)]
+        )
+    except Exception as e:
+        print(f"⚠ Semantic cache update failed: {e}")
+
+async def clear_caches():
+    """Invalidate cached answers after the vector store has been re-ingested."""
+    global _CHAIN
+    _CHAIN = None
+    query_cache.clear()
+    recent_queries.clear()
+    if semantic_cache is None or not await _ensure_redis_cache():
+        return
+    try:
+        # Load the index first so clear() also drops entries written by earlier processes
+        await asyncio.to_thread(semantic_cache._get_llm_cache, SEMANTIC_CACHE_NAMESPACE)
+        await asyncio.to_thread(semantic_cache.clear, llm_string=SEMANTIC_CACHE_NAMESPACE)
+        print("✓ Semantic cache cleared")
+    except Exception as e:
+        print(f"⚠ Semantic cache clear failed: {e}")
+
+def _with_rerank(retriever: BaseRetriever, compressor) -> BaseRetriever:
+    """Wrap a retriever with the Cohere compressor when one is configured."""
+    if compressor is None:
+        return retriever
+    return ContextualCompressionRetriever(
+        base_retriever=retriever,
+        base_compressor=compressor,
+    )
+
 async def _build_chain():
-    """Build RAG chain with retriever, optional reranking, and LLM."""
+    """Build multi-query and single-query retrievers (with optional reranking) and the LLM document chain."""
     store = await get_vector_store()
     base_retriever = store.as_retriever(search_kwargs={"k": RAG_K})
+    multi_query_retriever = base_retriever
     
     # Enable multi-query retrieval for improved results
     if USE_MULTI_QUERY:
@@ -68,7 +183,9 @@ async def _build_chain():
                 template=MULTI_QUERY_PROMPT_TEMPLATE
             )
             
-            llm_for_queries = ChatOpenAI(model=os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL), temperature=0)
+            llm_for_queries = ChatOpenAI(
+                model=OPENAI_MODEL, temperature=0, http_async_client=http_async_client
+            )
             multi_query_retriever = MultiQueryRetriever.from_llm(
                 retriever=base_retriever,
                 llm=llm_for_queries,
@@ -76,11 +193,11 @@ async def _build_chain():
                 include_original=True  # Always include the original query
             )
             print("✓ Multi-query retriever enabled")
-            base_retriever = multi_query_retriever
         except Exception as e:
             print(f"⚠ Multi-query retriever failed: {e}")
     
     # Apply Cohere reranking if configured
+    compressor = None
     cohere_api_key = os.getenv("COHERE_API_KEY")
     if cohere_api_key:
         try:
@@ -88,36 +205,122 @@ async def _build_chain():
                 top_n=RERANK_TOP_N,
                 model=COHERE_RERANK_MODEL,
             )
-            retriever = ContextualCompressionRetriever(
-                base_retriever=base_retriever,
-                base_compressor=compressor,
-            )
             print(f"✓ Cohere reranker enabled (top_n={RERANK_TOP_N})")
         except Exception as e:
             print(f"⚠ Cohere reranker failed: {e}")
-            retriever = base_retriever
-    else:
-        retriever = base_retriever
     
-    llm = ChatOpenAI(model=os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL))
+    retriever = _with_rerank(multi_query_retriever, compressor)
+    # Single-query fallback only exists when multi-query is actually in use
+    fast_retriever = None
+    if multi_query_retriever is not base_retriever:
+        fast_retriever = _with_rerank(base_retriever, compressor)
+    
+    llm = ChatOpenAI(model=OPENAI_MODEL, http_async_client=http_async_client)
     doc_chain = create_stuff_documents_chain(llm, prompt=PROMPT)
-    rag_chain = create_retrieval_chain(retriever, doc_chain)
 
-    return rag_chain
+    return retriever, fast_retriever, doc_chain
 
-async def answer_with_docs_async(question: str) -> Tuple[str, List[str], List[str]]:
-    """Query RAG system and return answer, sources, and context."""
-    chain = await _build_chain()
-    result = await chain.ainvoke({"input": question})
-    
-    answer = result["answer"]
-    sources = []
-    docs:List[Document] = result["context"]
-    unique_sources = {d.metadata.get("source") for d in docs}
-    sources = sorted(unique_sources)
-    
+async def _get_chain() -> Tuple[BaseRetriever, Optional[BaseRetriever], Runnable]:
+    """Return the cached retrievers and document chain, building them on first use."""
+    global _CHAIN
+    await _ensure_redis_cache()
+    if _CHAIN is not None:
+        return _CHAIN
+    async with _chain_lock:
+        if _CHAIN is None:
+            _CHAIN = await _build_chain()
+    return _CHAIN
+
+async def _retrieve(question: str) -> List[Document]:
+    """Retrieve documents, reusing cached results and skipping multi-query for paraphrases."""
+    retriever, fast_retriever, _ = await _get_chain()
+    query_embedding = await query_embeddings.aembed_query(question)
+
+    # Reuse documents retrieved for a near-duplicate question when possible
+    docs: Optional[List[Document]] = query_cache.lookup(query_embedding)
+    if docs is None:
+        retriever_to_use = retriever
+        if fast_retriever is not None:
+            similarity = recent_queries.max_similarity(query_embedding)
+            use_multi_query = similarity < MULTI_QUERY_SKIP_SIMILARITY
+            print(f"RETRIEVER: max_similarity={similarity:.3f} multi_query={use_multi_query}")
+            if not use_multi_query:
+                retriever_to_use = fast_retriever
+        docs = await retriever_to_use.ainvoke(question)
+        query_cache.insert(query_embedding, docs)
+
+    recent_queries.add(query_embedding)
+    return docs
+
+async def prewarm_async(questions: List[str]):
+    """Embed likely first questions and cache their retrieved documents ahead of use."""
+    retriever, _, _ = await _get_chain()
+    # Memoized, so asking a suggested question later skips the embedding call
+    vectors = await query_embeddings.aembed_documents(questions)
+
+    # An empty store would only cache empty results until the next ingest
+    store = await get_vector_store()
+    if not await store.asimilarity_search_by_vector(vectors[0], k=1):
+        print("⚠ Skipping query cache warm-up: vector store is empty")
+        return
+
+    # Full retriever, so cached entries match what a cold request would retrieve;
+    # the semaphore keeps its LLM calls from crowding out real requests
+    sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def _warm_one(question: str, vec: List[float]):
+        if query_cache.lookup(vec) is not None:
+            return
+        async with sem:
+            docs = await retriever.ainvoke(question)
+        if docs:
+            query_cache.insert(vec, docs)
+
+    await asyncio.gather(*[_warm_one(q, v) for q, v in zip(questions, vectors)])
+    print(f"✓ Prewarmed query cache with {len(questions)} questions")
+
+def _sources_and_context(docs: List[Document]) -> Tuple[List[str], List[str]]:
+    """Collect sorted unique sources and page contents from retrieved documents in one pass."""
+    unique_sources = set()
     context = []
     for d in docs:
+        unique_sources.add(d.metadata.get("source") or "unknown")
         context.append(d.page_content)
 
-    return answer, sources, context
\ No newline at end of file
+    return sorted(unique_sources), context
+
+async def answer_with_docs_async(question: str) -> Tuple[str, List[str], List[str]]:
+    """Query RAG system and return answer, sources, and context."""
+    cached = await _semantic_cache_lookup(question)
+    if cached is not None:
+        return cached
+
+    _, _, doc_chain = await _get_chain()
+    docs = await _retrieve(question)
+
+    answer = await doc_chain.ainvoke({"input": question, "context": docs})
+    sources, context = _sources_and_context(docs)
+
+    await _semantic_cache_update(question, answer, sources, context)
+    return answer, sources, context
+
+async def answer_with_docs_stream(question: str) -> AsyncIterator[Union[str, Tuple[List[str], List[str]]]]:
+    """Query RAG system, yielding answer tokens as they arrive and finally (sources, context)."""
+    cached = await _semantic_cache_lookup(question)
+    if cached is not None:
+        answer, sources, context = cached
+        yield answer
+        yield sources, context
+        return
+
+    _, _, doc_chain = await _get_chain()
+    docs = await _retrieve(question)
+
+    tokens: List[str] = []
+    async for token in doc_chain.astream({"input": question, "context": docs}):
+        tokens.append(token)
+        yield token
+    sources, context = _sources_and_context(docs)
+
+    await _semantic_cache_update(question, "".join(tokens), sources, context)
+    yield sources, context
@@ -1,24 +1,54 @@
 """Utility functions for vector store initialization."""
 
 import os
+import asyncio
+from typing import Optional
+import httpx
 from langchain_openai import OpenAIEmbeddings
 from langchain_postgres.v2.engine import PGEngine
+from langchain_postgres.v2.indexes import HNSWQueryOptions
 from langchain_postgres.v2.vectorstores import PGVectorStore
-from .constants import EMBEDDING_MODEL, EMBEDDING_TABLE_NAME
+from .constants import EMBEDDING_MODEL, EMBEDDING_TABLE_NAME, HNSW_EF_SEARCH
 
 PG_CONN_STR = os.getenv("DATABASE_URL")
 
+# Pooled engine so retrieval reuses connections instead of reconnecting per query
 PG_ENGINE = PGEngine.from_connection_string(
     url=PG_CONN_STR,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
 )
 
-embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+# Shared async HTTP client so OpenAI calls reuse pooled keep-alive connections
+http_async_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    timeout=60,
+)
+
+embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, http_async_client=http_async_client)
+
+# Vector store is created once per process and shared across requests
+_VECTOR_STORE: Optional[PGVectorStore] = None
+_vector_store_lock = asyncio.Lock()
 
 async def get_vector_store() -> PGVectorStore:
-    """Initialize and return PostgreSQL vector store instance."""
-    return await PGVectorStore.create(
-        engine=PG_ENGINE,
-        embedding_service=embeddings,
-        table_name=EMBEDDING_TABLE_NAME,
-    )
+    """Initialize (once) and return PostgreSQL vector store instance."""
+    global _VECTOR_STORE
+    if _VECTOR_STORE is not None:
+        return _VECTOR_STORE
+    async with _vector_store_lock:
+        if _VECTOR_STORE is None:
+            _VECTOR_STORE = await PGVectorStore.create(
+                engine=PG_ENGINE,
+                embedding_service=embeddings,
+                table_name=EMBEDDING_TABLE_NAME,
+                index_query_options=HNSWQueryOptions(ef_search=HNSW_EF_SEARCH),
+            )
+    return _VECTOR_STORE
+
+async def close_http_client():
+    """Close the shared async HTTP client."""
+    await http_async_client.aclose()
 
@@ -1,7 +1,33 @@
+"""
+Executive Order PDF Downloader
+
+Downloads the PDFs listed in a Federal Register CSV export into the data/ folder.
+
+Downloading is I/O-bound: workers spend their time blocked on sockets, which
+releases the GIL, so a ThreadPoolExecutor sharing one pooled requests.Session
+is the right tool. Do not move the downloads to a ProcessPoolExecutor; fork and
+IPC overhead would outweigh any gain. If a CPU-bound step (OCR, text extraction)
+is ever added, run it in a ProcessPoolExecutor over the already downloaded
+files and keep all HTTP requests in the threads.
+"""
+
 import os
 import csv
+import hashlib
+import json
+import logging
+import queue
+import shutil
+import socket
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Optional
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # https://www.federalregister.gov/presidential-documents/executive-orders
 # -------- CONFIG --------
@@ -9,56 +35,273 @@ CSV_FILE = "documents_signed_from_01_20_2025_to_01_11_2026_signed_by_donald_trum
 PDF_COLUMN = "pdf_url"          # column name containing PDF URLs
 OUTPUT_DIR = "data"             # directory to save PDFs
 TIMEOUT = 30                    # seconds
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, "manifest.jsonl")  # url/path/bytes/sha256 per PDF
+USER_AGENT = "civiclens-ai-downloader/0.1"
+MAX_WORKERS = 32                # concurrent downloads (and pooled connections)
+COPY_BUFFER_SIZE = 1024 * 1024  # bytes per read/write when saving a PDF
+VERIFY_EXISTING = False         # HEAD-check sizes of already downloaded PDFs
 # ------------------------
 
+PDF_MAGIC = b"%PDF-"
+
+class NotAPDFError(Exception):
+    """Raised when a download does not start with the PDF magic bytes."""
+
+class PartialDownloadError(Exception):
+    """Raised when a leftover .part file does not match the server's file size."""
+
+logger = logging.getLogger(__name__)
+
+def setup_logging() -> QueueListener:
+    """Route log records through a queue so a single thread writes to stdout."""
+    log_queue = queue.Queue(-1)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, handler)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
 def ensure_directory(path: str):
     """Create directory if it does not exist."""
     os.makedirs(path, exist_ok=True)
 
 def get_filename_from_url(url: str, index: int) -> str:
     """Extract filename from URL or generate one."""
-    parsed = urlparse(url)
-    filename = os.path.basename(parsed.path)
+    filename = url.split("?", 1)[0].split("#", 1)[0].rsplit("/", 1)[-1]
     if not filename.lower().endswith(".pdf"):
         filename = f"document_{index}.pdf"
     return filename
 
-def download_pdf(url: str, output_path: str):
-    """Download a single PDF."""
-    response = requests.get(url, stream=True, timeout=TIMEOUT)
-    response.raise_for_status()
+def enable_dns_cache():
+    """Memoize getaddrinfo for this run so reconnects skip DNS resolution."""
+    if not hasattr(socket.getaddrinfo, "cache_info"):
+        socket.getaddrinfo = lru_cache(maxsize=32)(socket.getaddrinfo)
 
-    with open(output_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+def build_session() -> requests.Session:
+    """Create an HTTP session that keeps connections alive between downloads."""
+    # requests/urllib3 speak HTTP/1.1 only: each worker holds one pooled
+    # keep-alive connection, so TLS handshakes are paid once per worker
+    # rather than once per file. HTTP/2 multiplexing would need httpx.
+    session = requests.Session()
 
-def main():
-    ensure_directory(OUTPUT_DIR)
+    # Retry transient failures (rate limits, 5xx) with backoff instead of losing the file
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+def download_pdf(session: requests.Session, url: str, output_path: str):
+    """
+    Download a single PDF to a .part file and rename it into place when complete.
+
+    A leftover .part file from an interrupted run is resumed with a Range request.
+    """
+    part_path = output_path + ".part"
+    existing = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # Ranges apply to the encoded body, so resumes must ask for it uncompressed
+    headers = {"Range": f"bytes={existing}-", "Accept-Encoding": "identity"} if existing else {}
+
+    logger.info(f"[DOWNLOADING] {url}" + (f" (resuming at byte {existing})" if existing else ""))
+    with session.get(url, stream=True, timeout=TIMEOUT, headers=headers) as response:
+        if response.status_code == 416:
+            # Range starts at or past the end; the .part is complete only if
+            # its size matches the total in "Content-Range: bytes */N"
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if not total.isdigit() or int(total) != existing:
+                os.unlink(part_path)
+                raise PartialDownloadError(
+                    f"{url}: partial file has {existing} bytes, server reports {total or 'unknown'}"
+                )
+        else:
+            response.raise_for_status()
+
+            # 206 returns only the missing suffix; 200 means the range was ignored
+            mode = "ab" if response.status_code == 206 else "wb"
+
+            response.raw.decode_content = True
+
+            # Fail fast on HTML error pages served with a 200 before touching disk
+            head = b""
+            if mode == "wb":
+                head = response.raw.read(len(PDF_MAGIC))
+                if head != PDF_MAGIC:
+                    raise NotAPDFError(f"{url} did not return a PDF (starts with {head!r})")
+
+            # Copy the raw stream to disk in C with 1 MiB buffers
+            with open(part_path, mode) as f:
+                f.write(head)
+                shutil.copyfileobj(response.raw, f, length=COPY_BUFFER_SIZE)
+
+    # Atomic on POSIX and Windows, so output_path only ever holds complete files
+    os.replace(part_path, output_path)
+
+def is_downloaded(session: requests.Session, url: str, output_path: str) -> bool:
+    """Check whether a PDF was already downloaded (optionally verified via HEAD)."""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return False
+    if not VERIFY_EXISTING:
+        return True
+
+    # Compare against the uncompressed size, which is what was written to disk
+    response = session.head(
+        url, timeout=TIMEOUT, allow_redirects=True, headers={"Accept-Encoding": "identity"}
+    )
+    if not response.ok:
+        return False
+    length = response.headers.get("Content-Length")
+    return length is None or int(length) == os.path.getsize(output_path)
 
+def fetch_pdf(session: requests.Session, url: str, output_path: str) -> tuple[bool, dict]:
+    """
+    Download a PDF unless it already exists.
+
+    Returns whether it was downloaded, plus its manifest record.
+    """
+    downloaded = not is_downloaded(session, url, output_path)
+    if downloaded:
+        download_pdf(session, url, output_path)
+
+    with open(output_path, "rb") as f:
+        sha256 = hashlib.file_digest(f, "sha256").hexdigest()
+    record = {
+        "url": url,
+        "path": output_path,
+        "bytes": os.path.getsize(output_path),
+        "sha256": sha256,
+    }
+    return downloaded, record
+
+def load_manifest() -> set[str]:
+    """Return URLs already recorded in the download manifest."""
+    if not os.path.exists(MANIFEST_FILE):
+        return set()
+
+    urls = set()
+    line = ""
+    with open(MANIFEST_FILE, encoding="utf-8") as f:
+        for line in f:
+            try:
+                urls.add(json.loads(line)["url"])
+            except (ValueError, KeyError):
+                # Ignore a line truncated by an interrupted run
+                continue
+
+    # Terminate a truncated last line so new records start on their own line
+    if line and not line.endswith("\n"):
+        with open(MANIFEST_FILE, "a", encoding="utf-8") as f:
+            f.write("\n")
+    return urls
+
+def load_jobs(on_first_url: Optional[Callable[[str], None]] = None) -> list[tuple[int, str]]:
+    """
+    Read unique (row index, PDF URL) pairs from the CSV before any downloads start.
+
+    on_first_url, if given, is called with the first non-empty URL as soon as it is read.
+    """
     with open(CSV_FILE, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
+        reader = csv.reader(csvfile)
+        header = next(reader)
 
-        if PDF_COLUMN not in reader.fieldnames:
+        if PDF_COLUMN not in header:
             raise ValueError(f"Column '{PDF_COLUMN}' not found in CSV.")
+        col = header.index(PDF_COLUMN)
 
+        rows = []
         for index, row in enumerate(reader, start=1):
-            url = row.get(PDF_COLUMN)
+            url = row[col] if col < len(row) else ""
+            if url and on_first_url is not None:
+                on_first_url(url)
+                on_first_url = None
+            rows.append((index, url))
 
-            if not url:
-                print(f"[SKIP] Row {index}: Empty URL")
-                continue
+    jobs = []
+    seen = set()
+    duplicates = 0
+    for index, url in rows:
+        if not url:
+            logger.info(f"[SKIP] Row {index}: Empty URL")
+            continue
+        if url in seen:
+            duplicates += 1
+            continue
+        seen.add(url)
+        jobs.append((index, url))
 
-            try:
-                filename = get_filename_from_url(url, index)
-                output_path = os.path.join(OUTPUT_DIR, filename)
+    if duplicates:
+        logger.info(f"[SKIP] {duplicates} duplicate URL(s)")
+    return jobs
 
-                print(f"[DOWNLOADING] {url}")
-                download_pdf(url, output_path)
-                print(f"[SAVED] {output_path}")
+def start_warm_up(session: requests.Session, url: str):
+    """Open a TLS connection to the URL's host in background so the pool starts warm."""
+    origin = "/".join(url.split("/", 3)[:3]) + "/"
 
-            except Exception as e:
-                print(f"[ERROR] Row {index}: {e}")
+    def _warm_up():
+        try:
+            session.head(origin, timeout=TIMEOUT)
+        except requests.RequestException:
+            pass
+
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+def download_all():
+    """Download every PDF listed in the CSV using a pool of worker threads."""
+    ensure_directory(OUTPUT_DIR)
+    enable_dns_cache()
+
+    with build_session() as session:
+        # Overlap the first TLS handshake with the rest of CSV parsing
+        jobs = load_jobs(on_first_url=lambda url: start_warm_up(session, url))
+
+        # URLs in the manifest are complete; skip them without touching the files
+        done = load_manifest()
+        if done:
+            pending = [(index, url) for index, url in jobs if url not in done]
+            logger.info(f"[SKIP] {len(jobs) - len(pending)} URL(s) already in manifest")
+            jobs = pending
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+                open(MANIFEST_FILE, "a", encoding="utf-8") as manifest:
+            prefix = OUTPUT_DIR + os.sep
+            futures = {}
+            for index, url in jobs:
+                output_path = prefix + get_filename_from_url(url, index)
+                future = executor.submit(fetch_pdf, session, url, output_path)
+                futures[future] = (index, output_path)
+
+            # Results are handled on this thread only, so manifest appends need no lock
+            for future in as_completed(futures):
+                index, output_path = futures[future]
+                try:
+                    downloaded, record = future.result()
+                except Exception as e:
+                    logger.error(f"[ERROR] Row {index}: {e}")
+                    continue
+
+                manifest.write(json.dumps(record) + "\n")
+                manifest.flush()
+                if downloaded:
+                    logger.info(f"[SAVED] {output_path}")
+                else:
+                    logger.info(f"[EXISTS] {output_path}")
+
+def main():
+    listener = setup_logging()
+    try:
+        download_all()
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
     main()